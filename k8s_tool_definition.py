@@ -1,3 +1,5 @@
+from tools.kubconnect import SUPPORTED_RESOURCE_TYPES
+
 K8S_TOOL_DEFINITION = {
     "type": "function",
     "function": {
@@ -8,10 +10,13 @@ K8S_TOOL_DEFINITION = {
             "properties": {
                 "resource_type": {
                     "type": "string",
-                    "description": "The type of K8s resource to query (e.g., 'pod', 'deployment', 'service')."
+                    "description": "The type of K8s resource to query (e.g., 'pod', 'deployment', 'service').",
+                    # Constrains decoding to the types the backend can actually serve
+                    "enum": list(SUPPORTED_RESOURCE_TYPES)
                 },
                 "namespace": {
                     "type": "string",
+                    "minLength": 1,
                     "description": "The Kubernetes namespace to query. Defaults to 'default' if not specified."
                 },
                 "name": {
@@ -1,14 +1,27 @@
 import os
-import requests
-import json
+import re
+import orjson
+import time
+import asyncio
+import httpx
 from k8s_tool_definition import K8S_TOOL_DEFINITION
-from cerebras.cloud.sdk import Cerebras
+from cerebras.cloud.sdk import AsyncCerebras, APIError, APIConnectionError, InternalServerError, RateLimitError
+from tenacity import retry, retry_if_exception, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from dotenv import load_dotenv 
 
 load_dotenv()
 
-client = Cerebras(api_key=os.getenv("CEREBRAS_API_KEY", "YOUR_API_KEY_HERE"))
+# Retries are handled by _create_completion below, so the SDK's own retries are disabled.
+# The SDK gets its own pooled httpx client so completions reuse keep-alive connections.
+async_client = AsyncCerebras(
+    api_key=os.getenv("CEREBRAS_API_KEY", "YOUR_API_KEY_HERE"),
+    max_retries=0,
+    http_client=httpx.AsyncClient(
+        timeout=httpx.Timeout(60, connect=10),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=10)
+    )
+)
 
 # --- Configuration ---
 # Replace with your actual Cerebras API endpoint and key
@@ -19,6 +32,99 @@ CEREBRAS_API_KEY = os.getenv("CEREBRAS_API_KEY", "YOUR_API_KEY_HERE")
 TOOL_SERVER_URL = "http://localhost:8000/execute_k8s"
 TOOL_API_KEY = api_key=os.getenv("TOOL_API_KEY")
 
+# Shared keep-alive client for the tool server, so every tool call reuses the
+# same connection instead of paying a fresh TCP handshake. The static headers
+# live on the client rather than being rebuilt for every call.
+tool_http = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+    headers={"X-API-Key": TOOL_API_KEY or "", "accept": "application/json"}
+)
+
+
+
+# --- Resilience ---
+class CircuitOpenError(Exception):
+    """Raised instead of calling the wrapped service while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing service for `reset_timeout` seconds after `fail_max`
+    consecutive failures. After that the circuit is half-open: a single trial call
+    goes through while every other caller keeps getting CircuitOpenError. The
+    trial closes the circuit if it succeeds and reopens it if it fails.
+    """
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = asyncio.Lock()
+
+    async def call(self, func, *args, **kwargs):
+        is_trial = False
+        async with self._lock:
+            if self._opened_at is not None:
+                if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Circuit is open; the service failed repeatedly and is being skipped.")
+                # Half-open: this caller is the one trial
+                self._trial_in_flight = is_trial = True
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self._failures += 1
+            if is_trial or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+            raise
+        else:
+            self._failures = 0
+            self._opened_at = None
+            return result
+        finally:
+            if is_trial:
+                self._trial_in_flight = False
+
+
+def _is_transient_http_error(exc: BaseException) -> bool:
+    """Connection problems and 5xx responses are worth retrying; 4xx are not."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in (500, 502, 503, 504)
+    return isinstance(exc, httpx.TransportError)
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=1, max=16),
+    retry=retry_if_exception_type((APIConnectionError, InternalServerError, RateLimitError)),
+    reraise=True
+)
+async def _create_completion(**kwargs):
+    """Calls the Cerebras chat completions API, retrying transient failures with backoff."""
+    return await async_client.chat.completions.create(**kwargs)
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=1, max=16),
+    retry=retry_if_exception(_is_transient_http_error),
+    reraise=True
+)
+async def _post_tool(tool_args: dict) -> dict:
+    """Posts one tool call to the tool server, retrying transient failures with backoff."""
+    tool_response = await tool_http.post(
+        TOOL_SERVER_URL,
+        content=orjson.dumps(tool_args),
+        headers={"Content-Type": "application/json"}
+    )
+    tool_response.raise_for_status()
+    return orjson.loads(tool_response.content)
+
+
+# A failing tool server short-circuits instead of stalling every query on retries
+tool_breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
+
 # --- System Prompt ---
 # This prompt guides the LLM on its role and how to use tools.
 SYSTEM_PROMPT = """
@@ -28,7 +134,86 @@ Do not make up answers. If the tool provides an error or empty result, state tha
 After the tool is called and you get the result, formulate a clear, human-readable answer for the user.
 """
 
-def run_agent_query(user_prompt: str):
+# Prompts that mention a Kubernetes resource always need the tool, so for them the
+# first call uses tool_choice="required" and the model cannot answer from memory.
+K8S_KEYWORDS = re.compile(
+    r"\b(pods?|services?|deployments?|statefulsets?|replicasets?|configmaps?|secrets?|"
+    r"ingress(es)?|jobs?|cronjobs?|namespaces?|nodes?|events?|kubernetes|k8s|cluster)\b",
+    re.IGNORECASE
+)
+
+
+# Simple lookups ("list the pods in kube-system", "describe deployment web in namespace prod")
+# map directly onto one tool call, so they skip the planning call to the LLM.
+FAST_ROUTE = re.compile(
+    r"^\s*(?:(?:can|could) you\s+|please\s+)*"
+    r"(?P<verb>list|show|get|describe)\s+(?:me\s+)?(?:all\s+)?(?:of\s+)?(?:the\s+)?"
+    r"(?P<resource>pod|service|deployment|statefulset|replicaset|configmap|secret|"
+    r"event|serviceaccount|endpoint)(?P<plural>es|s)?"
+    r"(?:\s+(?P<marker>named\s+|called\s+)?(?P<name_quote>['\"]?)(?P<name>[a-z0-9](?:[-a-z0-9.]*[a-z0-9])?)(?P=name_quote))??"
+    r"\s+in\s+(?:the\s+)?(?P<ns_prefix>namespace\s+)?(?P<ns_quote>['\"]?)(?P<namespace>[a-z0-9](?:[-a-z0-9]*[a-z0-9])?)(?P=ns_quote)"
+    r"(?P<ns_suffix>\s+namespace)?(?:\s+for\s+me)?\s*[?.!]?\s*$",
+    re.IGNORECASE
+)
+
+# "list pods not in default", "pods except kube-system": the LLM has to plan these
+FAST_ROUTE_NEGATION = re.compile(r"\b(?:not|no|except|excluding|without|outside)\b|n't\b", re.IGNORECASE)
+
+# Namespaces common enough to be recognised without a "namespace" marker or quotes
+FAST_ROUTE_WELL_KNOWN_NAMESPACES = frozenset({"default", "kube-system", "kube-public", "kube-node-lease"})
+
+# Words that slip through even a marked capture ("in my namespace", "get pod logs in default");
+# such prompts go to the LLM
+FAST_ROUTE_NOT_NAMESPACES = frozenset({
+    "cluster", "my", "this", "that", "every", "each", "all", "current", "any", "our", "your", "same"
+})
+FAST_ROUTE_NOT_NAMES = frozenset({
+    "logs", "log", "status", "details", "detail", "yaml", "json", "events", "info", "config",
+    "running", "pending", "failing", "failed", "crashing", "ready", "health"
+})
+
+
+def _fast_route(prompt: str) -> dict | None:
+    """
+    Returns a ready-made tool call for prompts FAST_ROUTE understands, or None
+    if the prompt needs the LLM to plan. When in doubt it returns None: a wrong
+    namespace or name here would produce a confident "nothing found" answer.
+
+    A name is only taken after a singular noun ("pod web-1") or "named"/"called", and
+    a namespace only when it is marked ("namespace prod", "prod namespace", quoted) or
+    well known ("default", "kube-system").
+    """
+    if FAST_ROUTE_NEGATION.search(prompt):
+        return None
+    match = FAST_ROUTE.match(prompt)
+    if not match:
+        return None
+
+    # Kubernetes names are lowercase; the pattern itself is case-insensitive
+    namespace = match["namespace"].lower()
+    name = match["name"].lower() if match["name"] else None
+    if name and match["plural"] and not match["marker"]:
+        return None
+    namespace_marked = match["ns_prefix"] or match["ns_suffix"] or match["ns_quote"]
+    if not namespace_marked and namespace not in FAST_ROUTE_WELL_KNOWN_NAMESPACES:
+        return None
+    if namespace in FAST_ROUTE_NOT_NAMESPACES or name in FAST_ROUTE_NOT_NAMES:
+        return None
+
+    tool_args = {
+        "resource_type": match["resource"].lower(),
+        "namespace": namespace
+    }
+    if name:
+        tool_args["name"] = name
+    return {
+        "id": "fast-route-0",
+        "type": "function",
+        "function": {"name": "execute_kubernetes_query", "arguments": orjson.dumps(tool_args).decode()}
+    }
+
+
+async def run_agent_query(user_prompt: str):
     """
     Manages the full conversation loop with the Cerebras LLM and the Kubernetes tool.
     """
@@ -57,22 +242,29 @@ def run_agent_query(user_prompt: str):
         "tool_choice": "auto" # Let the model decide when to call the tool
     }
 
-    try:
-        
-        chat_completion = client.chat.completions.create(
-            model="gpt-oss-120b",
-            messages=messages,
-            tools=[K8S_TOOL_DEFINITION],
-            tool_choice="auto"
-        )
-        
-        llm_response=chat_completion.model_dump()
-        response_message = llm_response['choices'][0]['message']
-        messages.append(response_message) # Add LLM's response to history
+    routed_call = _fast_route(user_prompt)
+    if routed_call:
+        # Record the call as if the LLM had made it, so the tool message below has a parent
+        print("⚡ Simple lookup, skipping the planning call.")
+        response_message = {"role": "assistant", "content": None, "tool_calls": [routed_call]}
+        messages.append(response_message)
+    else:
+        try:
+            
+            chat_completion = await _create_completion(
+                model="gpt-oss-120b",
+                messages=messages,
+                tools=[K8S_TOOL_DEFINITION],
+                tool_choice="required" if K8S_KEYWORDS.search(user_prompt) else "auto"
+            )
+            
+            llm_response=chat_completion.model_dump()
+            response_message = llm_response['choices'][0]['message']
+            messages.append(response_message) # Add LLM's response to history
 
-    except requests.exceptions.RequestException as e:
-        print(f"🔥 Error calling Cerebras API: {e}")
-        return
+        except APIError as e:
+            print(f"🔥 Error calling Cerebras API: {e}")
+            return
 
     # === Check if the LLM wants to call our tool ===
     if response_message.get("tool_calls"):
@@ -83,21 +275,14 @@ def run_agent_query(user_prompt: str):
             print("🤖 LLM wants to call the Kubernetes tool...")
             
             # --- Execute the tool call ---
-            tool_args = json.loads(tool_call["function"]["arguments"])
+            tool_args = orjson.loads(tool_call["function"]["arguments"])
             print(f"   Calling function with args: {tool_args}")
 
-            tool_headers = {
-                "X-API-Key": TOOL_API_KEY,
-                "Content-Type": "application/json",
-                "accept": "application/json"
-            }
-
             try:
-                tool_response = requests.post(TOOL_SERVER_URL, headers=tool_headers, json=tool_args)
-                tool_response.raise_for_status()
-                tool_result = tool_response.json()
+                tool_result = await tool_breaker.call(_post_tool, tool_args)
                 print(f"✅ Tool executed successfully.\n")
-            except requests.exceptions.RequestException as e:
+            except (httpx.HTTPError, orjson.JSONDecodeError, CircuitOpenError) as e:
+                # JSONDecodeError: a non-JSON reply, e.g. an empty body or a proxy's HTML page
                 print(f"🔥 Error calling tool server: {e}")
                 tool_result = {"error": str(e)}
 
@@ -106,7 +291,7 @@ def run_agent_query(user_prompt: str):
                 "role": "tool",
                 "tool_call_id": tool_call["id"],
                 "name": function_name,
-                "content": json.dumps(tool_result) # Content must be a string
+                "content": orjson.dumps(tool_result).decode() # Content must be a string
             })
 
             # === Second call to Cerebras API to get the final answer ===
@@ -114,18 +299,26 @@ def run_agent_query(user_prompt: str):
             payload["messages"] = messages # Update payload with full history
 
             try:
-                chat_completion = client.chat.completions.create(
+                # Stream the answer so the first tokens show up without waiting for the full completion
+                stream = await _create_completion(
                     model="gpt-oss-120b",
                     messages=messages,
                     tools=[K8S_TOOL_DEFINITION],
-                    tool_choice="auto"
+                    tool_choice="auto",
+                    stream=True
                 )
-                
-                final_response=chat_completion.model_dump()
-                final_message = final_response['choices'][0]['message']['content']
-                print(f"\n💬 DevOps Assistant:\n{final_message}")
 
-            except requests.exceptions.RequestException as e:
+                print("\n💬 DevOps Assistant:")
+                final_parts = []
+                async for chunk in stream:
+                    content = chunk.choices[0].delta.content if chunk.choices else None
+                    if content:
+                        final_parts.append(content)
+                        print(content, end="", flush=True)
+                print()
+                final_message = "".join(final_parts)
+
+            except APIError as e:
                 print(f"🔥 Error on second call to Cerebras API: {e}")
                 return
     else:
@@ -134,12 +327,20 @@ def run_agent_query(user_prompt: str):
         print(f"\n💬 DevOps Assistant:\n{final_message}")
 
 
+async def aclose_clients():
+    """
+    Closes the shared Cerebras and tool-server HTTP clients.
+    """
+    await tool_http.aclose()
+    await async_client.close()
+
+
 if __name__ == "__main__":
     # Example usage of the agent
     prompt = "Can you list the pods in the 'kube-system' namespace for me?"
-    run_agent_query(prompt)
+    asyncio.run(run_agent_query(prompt))
 
     print("\n" + "="*50 + "\n")
 
     prompt_with_name = "Describe the pod named 'my-app-pod-12345' in the 'production' namespace."
-    # run_agent_query(prompt_with_name) # Uncomment to try another query
+    # asyncio.run(run_agent_query(prompt_with_name)) # Uncomment to try another query
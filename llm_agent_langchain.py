@@ -1,28 +1,54 @@
 import os
+import asyncio
+import functools
+import traceback
+from contextvars import ContextVar
 from langchain_cerebras import ChatCerebras
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain import hub
-from langchain_core.tools import tool
+from langchain_core.tools import tool, ToolException
 from tools import kubconnect
-from typing import Dict, Any, Union, Optional
-from pydantic import BaseModel
-from langchain_core.messages import AIMessage, HumanMessage
+from typing import Dict, Any, Union, Optional, AsyncIterator, Tuple, List, Literal
+from pydantic import BaseModel, Field
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from aiolimiter import AsyncLimiter
 
 from dotenv import load_dotenv 
 
 load_dotenv()
 
+# Complete namespace-level list results memoized for the duration of one chat() turn,
+# keyed by (resource_type, namespace, limit). None outside of a turn.
+_turn_cache: ContextVar[Optional[dict]] = ContextVar("turn_cache", default=None)
+
+# The resource types the backend can serve. Exposing them as a Literal puts them in
+# the tool's JSON schema as an enum, so the model sees the allowed values once in
+# structured form instead of as a long list in the system prompt.
+ResourceType = Literal[kubconnect.SUPPORTED_RESOURCE_TYPES]
+
 class KubernetesResourceInput(BaseModel):
-    resource_type: str
-    namespace: str = "default"
+    resource_type: ResourceType
+    namespace: str = Field(default="default", min_length=1)
     name: Optional[str] = None # <--- This is the fix. It allows string or None.
+    names: Optional[List[str]] = None
+    label_selector: Optional[str] = None
+    field_selector: Optional[str] = None
+    fields: Optional[List[str]] = None
+    limit: int = Field(default=500, ge=1, le=1000)
+    continue_token: Optional[str] = None
 
 @tool("get_kubernetes_resource", args_schema=KubernetesResourceInput)
 def get_kubernetes_resource(
     resource_type: str, 
     namespace: str = "default", 
-    name: Optional[str] = None
+    name: Optional[str] = None,
+    names: Optional[List[str]] = None,
+    label_selector: Optional[str] = None,
+    field_selector: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    limit: int = 500,
+    continue_token: Optional[str] = None
 ) -> Dict[str, Union[str, Dict[str, Any]]]:
     """
     REQUIRED TOOL: Use this function to query the state of Kubernetes resources.
@@ -37,39 +63,81 @@ def get_kubernetes_resource(
         resource_type (str): The specific kind of resource. Use lowercase (e.g., 'pod', 'service', 'deployment').
         namespace (str, optional): The namespace to search in. Defaults to 'default'.
         name (str, optional): The name of a single resource (e.g., 'my-app-pod-1'). If omitted, lists ALL resources of the type in the namespace.
+        names (list[str], optional): Several resource names to fetch in one call. Use instead of 'name', never together with it.
+        label_selector (str, optional): Only list resources whose labels match, e.g. 'app=demo-app'.
+        field_selector (str, optional): Only list resources whose fields match, e.g. 'status.phase=Running'.
+        fields (list[str], optional): Return only these summary fields, e.g. ['name', 'phase', 'restarts', 'images'] for pods.
+        limit (int, optional): Maximum number of items in one list page. Defaults to 500.
+        continue_token (str, optional): The 'continue_token' of a truncated list, to fetch its next page.
         
     Returns:
         dict: A dictionary with 'status' ('success' or 'error') and the 'data', which contains the raw resource(s) in JSON format.
+              A truncated list also has a 'continue_token' for the next page.
     """
     
-    return kubconnect.execute_k8s_query(resource_type,namespace,name)
+    try:
+        return _fetch_resource(
+            resource_type, namespace, name, names, label_selector, field_selector, fields, limit, continue_token
+        )._asdict()
+    except Exception as e:
+        # handle_tool_error only sees ToolException; wrap so the failure reaches it
+        raise ToolException("get_kubernetes_resource failed") from e
+
+
+def _fetch_resource(
+    resource_type, namespace, name, names, label_selector, field_selector, fields, limit, continue_token
+) -> kubconnect.QueryResult:
+    turn_cache = _turn_cache.get()
+    if turn_cache is None or label_selector or field_selector or fields or continue_token:
+        # Filtered, projected or continued lists are not memoized: the turn cache holds
+        # complete namespace lists only
+        return kubconnect.execute_k8s_query(
+            resource_type, namespace, name, names, limit=limit, continue_token=continue_token,
+            field_selector=field_selector, label_selector=label_selector, fields=fields
+        )
 
+    # Satisfy repeat lists and by-name lookups from a list fetched earlier this turn
+    key = (resource_type.lower(), namespace, limit)
+    cached_list = turn_cache.get(key)
+    if cached_list is not None:
+        if not name and not names:
+            return cached_list
+        if names:
+            wanted = set(names)
+            items = [item for item in cached_list.data.get('items') or [] if (item.get('metadata') or {}).get('name') in wanted]
+            return kubconnect.QueryResult('success', {**cached_list.data, 'items': items})
+        for item in cached_list.data.get('items') or []:
+            if (item.get('metadata') or {}).get('name') == name:
+                return kubconnect.QueryResult('success', item)
 
-class KubernetesSREAgent:
-    """
-    A stateful agent that maintains a conversation session to diagnose
-    Kubernetes issues.
-    """
-    def __init__(self):
-        """
-        Initializes the agent, tools, and conversation memory one time.
-        """
-        print("--- Initializing SRE Agent ---")
-        llm = ChatCerebras(
-            model="gpt-oss-120b",
-            temperature=0,
-            api_key=os.getenv("CEREBRAS_API_KEY", "YOUR_API_KEY_HERE")
-        )
+    result = kubconnect.execute_k8s_query(resource_type, namespace, name, names, limit=limit)
+    # A truncated first page would make later by-name lookups miss items on other pages
+    if not name and not names and result.status == 'success' and result.continue_token is None:
+        turn_cache[key] = result
+    return result
 
-        tools = [get_kubernetes_resource]
+# Report schema violations (e.g. an unknown resource_type) back to the LLM instead of failing the run
+get_kubernetes_resource.handle_validation_error = True
 
-        # Your detailed system prompt remains the same
-        
-        sys_prompt="""
+
+TOOL_ERROR_MESSAGE = "The Kubernetes query failed because of an internal error. It has been logged; try again or ask about something else."
+
+
+def _report_tool_error(error: ToolException) -> str:
+    """Logs an unexpected failure inside the tool once and gives the LLM a fixed message to explain."""
+    print("🔥 get_kubernetes_resource raised an unexpected error:")
+    traceback.print_exception(error.__cause__ or error)
+    return TOOL_ERROR_MESSAGE
+
+# Unexpected errors (kubconnect only handles the expected ones) must not abort the agent turn
+get_kubernetes_resource.handle_tool_error = _report_tool_error
+
+
+SYS_PROMPT = """
     You are an expert Kubernetes Site Reliability Engineer (SRE) and a master of diagnostics. Your primary mission is to help users resolve issues within their Kubernetes cluster by methodically investigating the situation using the tools at your disposal.
 
     # PRIMARY DIRECTIVE
-    Your ability to function depends entirely on using the get_kubernetes_resource tool correctly. The most critical parameter is resource_type, and you are strictly limited to the values in the "Allowed resource_type Values" list below.
+    Your ability to function depends entirely on using the get_kubernetes_resource tool correctly. The most critical parameter is resource_type, and you are strictly limited to the values enumerated in the tool's schema.
 
     # TOOLS
 
@@ -79,84 +147,19 @@ class KubernetesSREAgent:
 
         * Arguments:
 
-            - resource_type (string, required): The type of Kubernetes resource to query. YOU MUST USE A VALUE FROM THE "ALLOWED resource_type VALUES" LIST.
+            - resource_type (string, required): The type of Kubernetes resource to query. YOU MUST USE ONE OF THE EXACT, LOWERCASE, SINGULAR VALUES ENUMERATED IN THE TOOL SCHEMA.
 
             - namespace (string, required): The Kubernetes namespace to search in.
 
             - name (string, optional): The specific name of the resource. If you omit this, the tool lists ALL resources of the specified type.
 
-    # ALLOWED resource_type VALUES
-        YOU MUST CHOOSE ONE OF THE FOLLOWING EXACT, CASE-SENSITIVE STRINGS. DO NOT USE PLURAL FORMS, GUESS, OR INVENT A RESOURCE TYPE. ANY DEVIATION WILL CAUSE A FAILURE.
-
-        pod
-
-        service
-
-        deployment
-
-        statefulset
-
-        replicaset
-
-        configmap
-
-        secret
-
-        persistentvolume
-
-        persistentvolumeclaim
-
-        ingress
+            - names (list of strings, optional): Several specific resource names fetched in a single call. Prefer this over repeated by-name calls; do not combine it with name.
 
-        networkpolicy
+            - label_selector / field_selector (string, optional): Server-side filters for list calls, e.g. label_selector "app=demo-app" or field_selector "status.phase=Running". Use them to narrow large lists.
 
-        job
+            - fields (list of strings, optional): Return a compact summary instead of full objects. Every type supports name, namespace, labels, created; pods add phase, node, images, ready, restarts; services add type, cluster_ip, ports, selector; deployments add replicas, ready_replicas, available_replicas, images. Start broad lists with fields, then fetch full objects by name.
 
-        cronjob
-
-        namespace
-
-        node
-
-        serviceaccount
-
-        resourcequota
-
-        limitrange
-
-        endpoint
-
-        event
-
-        horizontalpodautoscaler
-
-        role
-
-        rolebinding
-
-        clusterrole
-
-        clusterrolebinding
-
-        storageclass
-
-        volumeattachment
-
-        csidriver
-
-        csinode
-
-        csistoragecapacity
-
-        lease
-
-        priorityclass
-
-        runtimeclass
-
-        customresourcedefinition
-
-        apiservice
+            - limit / continue_token (optional): Lists return at most limit items (default 500). If the result has a continue_token, the list was truncated: call again with that continue_token (and the same other arguments) to get the next page.
 
     # DIAGNOSTIC WORKFLOW & GUIDING PRINCIPLES
 
@@ -166,7 +169,7 @@ class KubernetesSREAgent:
 
             - "app is crashing" -> Suspect pod, deployment, or replicaset.
 
-            - "can't connect" -> Suspect service, ingress, or networkpolicy.
+            - "can't connect" -> Suspect service, endpoint, or the pods behind the service.
 
             - "configuration error" -> Suspect configmap or secret.
 
@@ -200,15 +203,88 @@ class KubernetesSREAgent:
 
     """
 
-        # 1. THE PROMPT NOW INCLUDES A PLACEHOLDER FOR CHAT HISTORY
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", sys_prompt),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
 
-        agent = create_tool_calling_agent(llm, tools, prompt)
+# Agent runs allowed to start per minute across the whole process (chat, chat_stream
+# and chat_batch share one limiter), to stay under the Cerebras rate limit. 0 disables it.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+_llm_limiter = AsyncLimiter(LLM_REQUESTS_PER_MINUTE, 60) if LLM_REQUESTS_PER_MINUTE > 0 else None
+
+
+async def _acquire_llm_budget():
+    """Waits until the process-wide rate limit allows another agent run."""
+    if _llm_limiter is not None:
+        await _llm_limiter.acquire()
+
+
+# Chat history bounds: past HISTORY_MAX_MESSAGES, all but the last
+# HISTORY_KEEP_MESSAGES are replaced by a summary (see _compact_history)
+HISTORY_MAX_MESSAGES = 20
+HISTORY_KEEP_MESSAGES = 10
+
+SUMMARY_PROMPT = """
+    Summarize the following conversation between a user and a Kubernetes SRE assistant.
+    Keep every concrete fact needed to continue the investigation: namespaces, resource
+    names, observed statuses and errors, conclusions reached, and open questions.
+    Be concise.
+    """
+
+
+@functools.cache
+def _build_prompt() -> ChatPromptTemplate:
+    """
+    Builds the agent prompt once per process; it is identical for every session.
+    """
+    return ChatPromptTemplate.from_messages([
+        ("system", SYS_PROMPT),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+
+
+@functools.cache
+def _build_llm() -> ChatCerebras:
+    """
+    Creates the Cerebras chat model once per process.
+    """
+    return ChatCerebras(
+        model="gpt-oss-120b",
+        temperature=0,
+        max_retries=5, # Exponential backoff on connection errors, 429s and 5xx
+        api_key=os.getenv("CEREBRAS_API_KEY", "YOUR_API_KEY_HERE")
+    )
+
+
+@functools.cache
+def _build_agent():
+    """
+    Builds the tool-calling agent once per process and returns it with its tools.
+
+    The agent is stateless (history is passed in per call), so every
+    KubernetesSREAgent can share it and only needs its own AgentExecutor.
+    """
+    tools = [get_kubernetes_resource]
+    agent = create_tool_calling_agent(_build_llm(), tools, _build_prompt())
+    return agent, tools
+
+
+class KubernetesSREAgent:
+    """
+    A stateful agent that maintains a conversation session to diagnose
+    Kubernetes issues.
+    """
+    def __init__(self, enable_parallel_tool_execution: bool = True):
+        """
+        Initializes the agent, tools, and conversation memory one time.
+
+        Args:
+            enable_parallel_tool_execution (bool): If True, tool calls returned by the LLM
+                in the same turn (e.g. pod + service + deployment) are executed concurrently.
+                If False, they are executed one after another.
+        """
+        print("--- Initializing SRE Agent ---")
+        # 1. THE LLM, TOOLS AND PROMPT ARE SHARED BY EVERY AGENT INSTANCE
+        agent, tools = _build_agent()
 
         self.agent_executor = AgentExecutor(
             agent=agent,
@@ -218,28 +294,164 @@ class KubernetesSREAgent:
             handle_parsing_errors=True
         )
 
+        self.enable_parallel_tool_execution = enable_parallel_tool_execution
+
+        # Back repeated resource lookups with the watch-based cache
+        kubconnect.start_informers()
+
         # 2. INITIALIZE AN EMPTY CHAT HISTORY FOR THE SESSION
         self.chat_history = []
+        self._compaction_task = None
         print("--- Agent is ready. A new session has started. ---")
 
-    def chat(self, user_question: str) -> str:
+    @staticmethod
+    def preload():
+        """
+        Builds the LLM, prompt and agent shared by all instances ahead of the first session.
+        """
+        _build_agent()
+
+    async def chat(self, user_question: str) -> str:
         """
         Runs a single turn of the conversation.
         """
         print(f"\n> USER: {user_question}")
 
         # 3. PASS THE CURRENT CHAT HISTORY TO THE AGENT
-        response = self.agent_executor.invoke({
+        response = await self._run_executor({
             "input": user_question,
             "chat_history": self.chat_history
         })
 
         # 4. UPDATE THE CHAT HISTORY WITH THE LATEST INTERACTION
+        self._record_turn(user_question, response["output"])
+        self._schedule_compaction()
+        return response["output"]
+
+    async def chat_batch(
+        self,
+        prompts: List[str],
+        max_concurrency: int = 8
+    ) -> List[str]:
+        """
+        Answers several independent questions concurrently.
+
+        Every prompt sees the current chat history, but the batch does not add to it.
+
+        Args:
+            prompts (list[str]): The questions to answer.
+            max_concurrency (int): Maximum number of agent runs in flight at once.
+                Every run also counts against the shared LLM_REQUESTS_PER_MINUTE budget.
+
+        Returns:
+            list[str]: The answers, in the same order as the prompts.
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+        history = list(self.chat_history)
+
+        async def _one(prompt: str) -> str:
+            async with sem:
+                response = await self._run_executor({"input": prompt, "chat_history": history})
+                return response["output"]
+
+        return await asyncio.gather(*[_one(p) for p in prompts])
+
+    async def _run_executor(self, agent_input: dict) -> dict:
+        """
+        Runs the agent executor once with a fresh per-turn lookup memo.
+        """
+        await _acquire_llm_budget()
+        turn_token = _turn_cache.set({})
+        try:
+            if self.enable_parallel_tool_execution:
+                # The async executor dispatches all tool calls of one LLM step with
+                # asyncio.gather, and the sync tool runs in a worker thread, so N
+                # independent lookups cost one round-trip instead of N.
+                return await self.agent_executor.ainvoke(agent_input)
+            return await asyncio.to_thread(self.agent_executor.invoke, agent_input)
+        finally:
+            _turn_cache.reset(turn_token)
+
+    async def chat_stream(self, user_question: str) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Runs a single turn of the conversation, streaming the LLM output as it is generated.
+
+        Yields ("token", text) for every streamed chunk, then a single ("output", answer)
+        with the agent's final answer once the turn is complete.
+        """
+        print(f"\n> USER: {user_question}")
+
+        agent_input = {
+            "input": user_question,
+            "chat_history": self.chat_history
+        }
+        tokens = []
+        output = None
+        await _acquire_llm_budget()
+        # Not reset via token: the generator may be closed from another context
+        _turn_cache.set({})
+        try:
+            async for event in self.agent_executor.astream_events(agent_input, version="v2"):
+                if event["event"] == "on_chat_model_stream":
+                    content = event["data"]["chunk"].content
+                    if content:
+                        tokens.append(content)
+                        yield "token", content
+                elif event["event"] == "on_chain_end" and not event["parent_ids"]:
+                    output = event["data"]["output"]["output"]
+        finally:
+            _turn_cache.set(None)
+
+        if output is None:
+            output = "".join(tokens)
+        self._record_turn(user_question, output)
+        # Summarize in the background: awaiting it here would hold the stream (and the
+        # client's SSE response) open through another LLM call after the answer
+        self._schedule_compaction()
+        yield "output", output
+
+    def _record_turn(self, user_question: str, answer: str):
+        """
+        Appends one question/answer pair to the chat history.
+        """
         self.chat_history.append(HumanMessage(content=user_question))
-        self.chat_history.append(AIMessage(content=response["output"]))
+        self.chat_history.append(AIMessage(content=answer))
+        print(f"\n< AI: {answer}")
 
-        print(f"\n< AI: {response['output']}")
-        return response["output"]
+    def _schedule_compaction(self):
+        """
+        Starts _compact_history as a background task when the history is over the limit
+        and no compaction is already running.
+        """
+        if len(self.chat_history) <= HISTORY_MAX_MESSAGES:
+            return
+        if self._compaction_task is None or self._compaction_task.done():
+            self._compaction_task = asyncio.create_task(self._compact_history())
+
+    async def _compact_history(self):
+        """
+        Keeps the prompt size bounded: once the history grows past HISTORY_MAX_MESSAGES,
+        everything but the last HISTORY_KEEP_MESSAGES is folded into a single summary message.
+        """
+        history = self.chat_history
+        if len(history) <= HISTORY_MAX_MESSAGES:
+            return
+
+        older = history[:-HISTORY_KEEP_MESSAGES]
+        transcript = "\n".join(f"{message.type}: {message.content}" for message in older)
+        try:
+            summary = await _build_llm().ainvoke([
+                SystemMessage(content=SUMMARY_PROMPT),
+                HumanMessage(content=transcript)
+            ])
+            head = [SystemMessage(content=f"Prior context: {summary.content}")]
+        except Exception as e:
+            # Dropping old turns is better than letting the prompt grow without bound
+            print(f"Warning: could not summarize chat history, dropping older turns: {e}")
+            head = []
+        # Keep turns recorded while the summary was being generated; leave a reset session alone
+        if self.chat_history is history:
+            self.chat_history = head + history[len(older):]
 
     def start_new_session(self):
         """
@@ -252,24 +464,28 @@ class KubernetesSREAgent:
 
 
 # --- HOW TO USE THE STATEFUL AGENT ---
-if __name__ == "__main__":
+async def _demo():
     # Create the agent instance ONCE
     sre_agent = KubernetesSREAgent()
 
     # --- First Conversation Thread ---
     # Ask the first question
-    sre_agent.chat("The web-app in the app-test namespace is not working. Can you check the pods?")
+    await sre_agent.chat("The web-app in the app-test namespace is not working. Can you check the pods?")
 
     # Ask a follow-up question. The agent will remember the context (namespace and app name).
-    sre_agent.chat("Okay, that pod looks bad. What about the service associated with it?")
+    await sre_agent.chat("Okay, that pod looks bad. What about the service associated with it?")
     
     # Ask another follow-up
-    sre_agent.chat("Thanks. Now check the related deployment.")
+    await sre_agent.chat("Thanks. Now check the related deployment.")
 
     # --- Start a completely new conversation ---
     sre_agent.start_new_session()
 
-    sre_agent.chat("I have a different problem now. Can you list all namespaces in the cluster?")
+    await sre_agent.chat("I have a different problem now. Can you list all namespaces in the cluster?")
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
 
 
 
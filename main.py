@@ -1,20 +1,52 @@
 import os
-import shutil
-from typing import Optional
+import asyncio
+import orjson
+import aiofiles
+from typing import Optional, List
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from llm_agent_langchain import KubernetesSREAgent
+from llm_agent import aclose_clients
+from tools import kubconnect
+from cachetools import TTLCache
 
 
-sre_agent = KubernetesSREAgent()
+# One agent (and chat history) per browser session; idle sessions expire after 30 minutes
+SESSIONS = TTLCache(maxsize=1000, ttl=1800)
 
 
+def _get_agent(session_id: str) -> KubernetesSREAgent:
+    """
+    Returns the agent for a session, creating it on first use.
+    """
+    agent = SESSIONS.get(session_id)
+    if agent is None:
+        agent = KubernetesSREAgent()
+    # Re-inserting restarts the TTL, so sessions expire after being idle rather than after creation
+    SESSIONS[session_id] = agent
+    return agent
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Builds the shared LLM/agent pieces when the server starts (off the event loop,
+    so each worker boots without blocking) and releases everything on shutdown.
+    """
+    await asyncio.to_thread(KubernetesSREAgent.preload)
+    yield
+    SESSIONS.clear()
+    kubconnect.stop_informers()
+    await aclose_clients()
+    cleanup_on_shutdown()
 
-app = FastAPI(title="DevOps Cloud Query System")
+
+app = FastAPI(title="DevOps Cloud Query System", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -33,6 +65,11 @@ UPLOAD_DIR = "/tmp/uploads"
 CONFIG_FILENAME = "config" # The constant name for the uploaded file
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 CONFIG_FILE_PATH = os.path.join(UPLOAD_DIR, CONFIG_FILENAME)
+UPLOAD_CHUNK_SIZE = 1 << 16 # 64 KiB per read/write while saving uploads
+# Admission control for /query/batch; the per-minute LLM budget is process-wide
+# (LLM_REQUESTS_PER_MINUTE in llm_agent_langchain.py)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "20"))
 # --- END MODIFIED CONSTANTS ---
 
 # Store session data in memory (kept for /query and /clear, though simplified)
@@ -42,11 +79,14 @@ class QueryRequest(BaseModel):
     query: str
     session_id: str
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(min_length=1, max_length=BATCH_MAX_QUERIES)
+    session_id: Optional[str] = None
+
 class ClearRequest(BaseModel):
     session_id: str
 
 
-@app.on_event("shutdown")
 def cleanup_on_shutdown():
     """
     Deletes the 'config' file when the FastAPI application process is stopped.
@@ -61,9 +101,6 @@ def cleanup_on_shutdown():
     else:
         print("Config file not found. Nothing to delete.")
     
-    # You could also call sre_agent.start_new_session() here if needed, 
-    # but the primary goal is resource cleanup.
-    
     print("--- Shutdown Cleanup Complete ---")
 
 
@@ -81,10 +118,12 @@ async def upload_file(file: UploadFile = File(...), session_id: str = Form(...))
         # Overwrite the existing 'config' file if it exists
         
         # Save file to disk with constant name 'config'
-        with open(file_path, "wb") as buffer:
+        async with aiofiles.open(file_path, "wb") as buffer:
             # Important: Ensure the file pointer is at the beginning before copying
             await file.seek(0) 
-            shutil.copyfileobj(file.file, buffer)
+            # Copy in chunks so other requests keep being served during the write
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await buffer.write(chunk)
 
         print(f"[UPLOAD] File saved at: {file_path}")
             
@@ -100,14 +139,14 @@ async def upload_file(file: UploadFile = File(...), session_id: str = Form(...))
             "size": os.path.getsize(file_path)
         }
 
-        return JSONResponse({
+        return ORJSONResponse({
             "message": f"File uploaded and saved as '{CONFIG_FILENAME}' successfully.",
             "saved_as": CONFIG_FILENAME,
             "original_filename": file.filename,
             "filepath": file_path
         })
     except Exception as e:
-        return JSONResponse(status_code=500, content={"detail": f"Error uploading file: {str(e)}"})
+        return ORJSONResponse(status_code=500, content={"detail": f"Error uploading file: {str(e)}"})
 # --- END MODIFIED FILE UPLOAD ENDPOINT ---
 
 # --- MODIFIED QUERY ENDPOINT (Simplified Check) ---
@@ -120,35 +159,69 @@ async def process_query(request: QueryRequest):
         # Check if the constant 'config' file exists
         config_file_path = os.path.join(UPLOAD_DIR, CONFIG_FILENAME)
         if not os.path.exists(config_file_path):
-            return JSONResponse(status_code=400, content={"detail": "Required file 'config' not found in uploads folder."})
+            return ORJSONResponse(status_code=400, content={"detail": "Required file 'config' not found in uploads folder."})
         
         # Now, you can pass the file path to your agent (or access it from the agent's logic)
         # Example of agent using the file (assuming the agent's chat method handles loading it)
         # Note: In a real scenario, you might want to pass the path explicitly or ensure the agent logic knows to look there.
         # For this example, let's assume the agent uses the file via logic similar to agent_logic.py
         
-        response = sre_agent.chat(query)
-        
         # Get the original filename for the response message if available
         original_filename = session_data.get(session_id, {}).get("filename", CONFIG_FILENAME)
-        
-        return JSONResponse({
-            "response": response,
-            "query": query,
-            "file_analyzed": f"{CONFIG_FILENAME} (Original: {original_filename})"
-        })
+        agent = _get_agent(session_id)
+
+        async def _gen():
+            # Server-Sent Events: one "data" frame per token, then a "done" frame
+            # carrying the final answer. Errors after the stream started can no
+            # longer change the status code, so they are sent as an "error" frame.
+            try:
+                async for kind, text in agent.chat_stream(query):
+                    if kind == "token":
+                        yield f"data: {orjson.dumps({'token': text}).decode()}\n\n"
+                    else:
+                        done = {
+                            "response": text,
+                            "query": query,
+                            "file_analyzed": f"{CONFIG_FILENAME} (Original: {original_filename})"
+                        }
+                        yield f"event: done\ndata: {orjson.dumps(done).decode()}\n\n"
+            except Exception as e:
+                error = {"detail": f"Error processing query: {str(e)}"}
+                yield f"event: error\ndata: {orjson.dumps(error).decode()}\n\n"
+
+        return StreamingResponse(_gen(), media_type="text/event-stream")
     except Exception as e:
-        return JSONResponse(status_code=500, content={"detail": f"Error processing query: {str(e)}"})
+        return ORJSONResponse(status_code=500, content={"detail": f"Error processing query: {str(e)}"})
 # --- END MODIFIED QUERY ENDPOINT ---
 
+# --- BATCH QUERY ENDPOINT ---
+@app.post("/query/batch")
+async def process_query_batch(request: BatchQueryRequest):
+    """Answers several independent queries concurrently and returns all answers at once."""
+    try:
+        config_file_path = os.path.join(UPLOAD_DIR, CONFIG_FILENAME)
+        if not os.path.exists(config_file_path):
+            return ORJSONResponse(status_code=400, content={"detail": "Required file 'config' not found in uploads folder."})
+
+        # Without a session the batch runs on a throwaway agent with an empty history
+        agent = _get_agent(request.session_id) if request.session_id else KubernetesSREAgent()
+        responses = await agent.chat_batch(request.queries, max_concurrency=BATCH_MAX_CONCURRENCY)
+
+        return ORJSONResponse({
+            "responses": responses,
+            "queries": request.queries
+        })
+    except Exception as e:
+        return ORJSONResponse(status_code=500, content={"detail": f"Error processing batch query: {str(e)}"})
+# --- END BATCH QUERY ENDPOINT ---
+
 # --- CLEANUP ENDPOINT (Simplified) ---
 @app.post("/clear")
 async def clear_history(request: ClearRequest):
     """Manual clear button - clears current session and deletes the 'config' file."""
     try:
-        sre_agent.start_new_session()
-        
         session_id = request.session_id
+        SESSIONS.pop(session_id, None)
         
         # Delete the constant file
         config_file_path = os.path.join(UPLOAD_DIR, CONFIG_FILENAME)
@@ -161,14 +234,14 @@ async def clear_history(request: ClearRequest):
 
         return {"message": f"Upload history cleared successfully. '{CONFIG_FILENAME}' deleted."}
     except Exception as e:
-        return JSONResponse(status_code=500, content={"detail": f"Error clearing history: {str(e)}"})
+        return ORJSONResponse(status_code=500, content={"detail": f"Error clearing history: {str(e)}"})
 
 # --- CLEANUP ALL (Simplified) ---
 @app.post("/cleanup-all")
 async def cleanup_all_sessions():
     """Deletes the constant 'config' file and clears all memory."""
     try:
-        sre_agent.start_new_session()
+        SESSIONS.clear()
         
         config_file_path = os.path.join(UPLOAD_DIR, CONFIG_FILENAME)
         deleted_count = 0
@@ -185,7 +258,7 @@ async def cleanup_all_sessions():
             "deleted_count": deleted_count
         }
     except Exception as e:
-        return JSONResponse(status_code=500, content={"detail": f"Error cleaning up all sessions: {str(e)}"})
+        return ORJSONResponse(status_code=500, content={"detail": f"Error cleaning up all sessions: {str(e)}"})
 # --- END CLEANUP ALL (Simplified) ---
 
 @app.get("/", response_class=HTMLResponse)
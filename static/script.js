@@ -92,11 +92,29 @@ async function submitQuery() {
                 session_id: currentSessionId
             })
         });
-        const data = await response.json();
-        removeLoadingMessage(loadingId);
+        if (!response.ok) {
+            const data = await response.json();
+            removeLoadingMessage(loadingId);
+            alert('Query failed: ' + data.detail);
+            return;
+        }
 
-        if (response.ok) addMessageToChat(data.response, 'assistant');
-        else alert('Query failed: ' + data.detail);
+        // The answer is streamed as Server-Sent Events: tokens first, then the final answer
+        let messageDiv = null;
+        let streamed = '';
+        await readEventStream(response, (event, data) => {
+            if (event === 'error') throw new Error(data.detail);
+
+            if (!messageDiv) {
+                removeLoadingMessage(loadingId);
+                messageDiv = addMessageToChat('', 'assistant');
+            }
+            streamed = event === 'done' ? data.response : streamed + data.token;
+            messageDiv.querySelector('.message-content').textContent = streamed;
+            const chatMessages = document.getElementById('chatMessages');
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        });
+        removeLoadingMessage(loadingId);
     } catch (error) {
         removeLoadingMessage(loadingId);
         alert('Error processing query: ' + error.message);
@@ -124,6 +142,33 @@ function addMessageToChat(content, sender) {
     `;
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return messageDiv;
+}
+
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
 }
 
 function addLoadingMessage() {
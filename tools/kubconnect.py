@@ -1,50 +1,772 @@
+import os
+import sys
 import json
-from typing import Dict, Any, Union
+import hashlib
+import time
+import asyncio
+import functools
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Dict, Any, List, NamedTuple, Optional
   # also needed if you use shutil.copyfileobj
 
 
-# Import Kubernetes client components, though they are skipped in demo_mode
+# The Kubernetes client is slow to import (urllib3, ssl, yaml, dateutil...) and demo mode
+# never needs it, so it is imported on first live use by _load_kubernetes()
+client = config = Retry = yaml = None
+
+
+class ApiException(Exception):
+    """Stands in for kubernetes' ApiException until the client is loaded; never raised."""
+
+
+class ConfigException(Exception):
+    """Stands in for kubernetes' ConfigException until the client is loaded; never raised."""
+
+
+# Network failures reported to the caller as "unreachable"; urllib3's own classes
+# (MaxRetryError once retries are exhausted, ProtocolError, SSLError) join once loaded
+_TRANSIENT_ERRORS = (TimeoutError, ConnectionError)
+
+
+def _load_kubernetes():
+    global client, config, Retry, yaml, ApiException, ConfigException, _TRANSIENT_ERRORS
+    if client is not None:
+        return
+    try:
+        from kubernetes import client as k8s_client, config as k8s_config
+        from kubernetes.client.exceptions import ApiException as K8sApiException
+        from kubernetes.config import ConfigException as K8sConfigException
+        from urllib3 import exceptions as urllib3_exceptions
+        from urllib3.util.retry import Retry as UrllibRetry
+        import yaml as k8s_yaml
+    except ImportError:
+        warnings.warn("'kubernetes' library not found. Live execution will fail.")
+        raise
+    config, Retry, yaml = k8s_config, UrllibRetry, k8s_yaml
+    ApiException, ConfigException = K8sApiException, K8sConfigException
+    _TRANSIENT_ERRORS = (
+        TimeoutError, ConnectionError,
+        urllib3_exceptions.MaxRetryError, urllib3_exceptions.ProtocolError,
+        urllib3_exceptions.SSLError, urllib3_exceptions.TimeoutError,
+    )
+    # Assigned last: a non-None client means everything above is in place
+    client = k8s_client
+
+# orjson is optional: it decodes large list bodies several times faster than the stdlib
 try:
-    from kubernetes import client, config
-    from kubernetes.client.exceptions import ApiException
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
 except ImportError:
-    # Allows the function to be defined even if kubernetes client isn't installed
-    # as long as we only run in demo_mode
-    print("Warning: 'kubernetes' library not found. Live execution will fail.")
-    pass 
+    _json_loads = json.loads
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+# cachetools is optional: without it the in-process response cache tier is disabled
+try:
+    from cachetools import TTLCache
+except ImportError:
+    TTLCache = None
+
+# Redis is optional: without it (or without REDIS_URL) the shared response cache is disabled
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# ijson is optional: it lets execute_k8s_query_stream parse list bodies item by item
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# The kubeconfig uploaded through the web UI (see UPLOAD_DIR in main.py)
+KUBECONFIG_PATH = "/tmp/uploads/config"
+
+# Size of the urllib3 connection pool shared by every API group
+CONNECTION_POOL_MAXSIZE = 50
+
+# Idempotent GETs are retried with exponential backoff on connection errors and
+# throttling/overload responses; Retry-After from the apiserver is honoured
+API_RETRIES = 3
+API_RETRY_BACKOFF = 0.2
+API_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Seconds an informer keeps watching after its last read before it stops itself
+INFORMER_IDLE_TTL = 60
+INFORMER_RELIST_PAGE_SIZE = 500
+
+# Shared response cache, e.g. "redis://localhost:6379/0"; entries live RESPONSE_CACHE_TTL seconds
+REDIS_URL = os.getenv("REDIS_URL")
+RESPONSE_CACHE_TTL = 15
+# A Redis that accepts connections but never answers must not hang queries
+REDIS_SOCKET_TIMEOUT = 0.5
+
+# Never written to the response cache (Redis stores values in plaintext)
+_UNCACHED_RESOURCES = frozenset({'secret'})
+
+# In-process tier in front of Redis for repeat questions a few seconds apart
+LOCAL_CACHE_TTL = float(os.getenv("K8S_LOCAL_CACHE_TTL", "5"))
+LOCAL_CACHE_MAXSIZE = 256
+
 
+# {resource: (api_version, method_suffix)}, kept in sync with tools/resources.csv.
+# Set K8S_RESOURCE_MAP_CSV to load the mapping from a CSV file instead.
+_RESOURCE_MAP = MappingProxyType({
+    'pod': ('v1', 'pod'),
+    'service': ('v1', 'service'),
+    'deployment': ('apps_v1', 'deployment'),
+    'statefulset': ('apps_v1', 'stateful_set'),
+    'replicaset': ('apps_v1', 'replica_set'),
+    'configmap': ('v1', 'config_map'),
+    'secret': ('v1', 'secret'),
+    'persistentvolume': ('v1', 'persistent_volume'),
+    'persistentvolumeclaim': ('v1', 'persistent_volume_claim'),
+    'ingress': ('networking_v1', 'ingress'),
+    'networkpolicy': ('networking_v1', 'network_policy'),
+    'job': ('batch_v1', 'job'),
+    'cronjob': ('batch_v1', 'cron_job'),
+    'namespace': ('v1', 'namespace'),
+    'node': ('v1', 'node'),
+    'serviceaccount': ('v1', 'service_account'),
+    'resourcequota': ('v1', 'resource_quota'),
+    'limitrange': ('v1', 'limit_range'),
+    'endpoint': ('v1', 'endpoints'),
+    'event': ('v1', 'event'),
+    'horizontalpodautoscaler': ('autoscaling_v1', 'horizontal_pod_autoscaler'),
+    'role': ('rbac_authorization_v1', 'role'),
+    'rolebinding': ('rbac_authorization_v1', 'role_binding'),
+    'clusterrole': ('rbac_authorization_v1', 'cluster_role'),
+    'clusterrolebinding': ('rbac_authorization_v1', 'cluster_role_binding'),
+    'storageclass': ('storage_v1', 'storage_class'),
+    'volumeattachment': ('storage_v1', 'volume_attachment'),
+    'csidriver': ('storage_v1', 'csi_driver'),
+    'csinode': ('storage_v1', 'csi_node'),
+    'csistoragecapacity': ('storage_v1', 'csi_storage_capacity'),
+    'lease': ('coordination_v1', 'lease'),
+    'priorityclass': ('scheduling_v1', 'priority_class'),
+    'runtimeclass': ('node_v1', 'runtime_class'),
+    'customresourcedefinition': ('apiextensions_v1', 'custom_resource_definition'),
+    'apiservice': ('apiregistration_v1', 'api_service'),
+})
+
+# API groups _build_method_table binds, and the resources in them that have no
+# namespaced list/read methods; together they decide what execute_k8s_query can serve
+_SERVED_API_VERSIONS = frozenset({'v1', 'apps_v1'})
+_CLUSTER_SCOPED = frozenset({'persistentvolume', 'namespace', 'node'})
+
+# The resource types execute_k8s_query can actually serve. The tool schemas build their
+# resource_type enum from this, so the model is never steered to an unsupported type.
+SUPPORTED_RESOURCE_TYPES = tuple(
+    resource for resource, (api_version, _) in _RESOURCE_MAP.items()
+    if api_version in _SERVED_API_VERSIONS and resource not in _CLUSTER_SCOPED
+)
+_RESOURCE_MAP_CSV = os.getenv("K8S_RESOURCE_MAP_CSV")
+
+# The shared ApiClient, its response-cache scope and the kubeconfig mtime it was built from
+# (see _ensure_kube_loaded)
+_API_CLIENT = None
+_CACHE_SCOPE = None
+_KUBECONFIG_MTIME = None
+_KUBE_LOCK = threading.Lock()
+
+
+def _ensure_kube_loaded():
+    """
+    Loads the kubeconfig once and returns the single ApiClient shared by all API groups.
+
+    The client is rebuilt only when the kubeconfig's modification time changes, so
+    uploading a new config takes effect without reparsing it on every call. The
+    lock makes concurrent first calls (parallel tool calls) load it only once.
+    """
+    global _API_CLIENT, _CACHE_SCOPE, _KUBECONFIG_MTIME
+    mtime = os.stat(KUBECONFIG_PATH).st_mtime_ns
+    if _API_CLIENT is not None and _KUBECONFIG_MTIME == mtime:
+        return _API_CLIENT
+
+    with _KUBE_LOCK:
+        if _API_CLIENT is None or _KUBECONFIG_MTIME != mtime:
+            _load_kubernetes()
+            configuration = client.Configuration()
+            try:
+                config.load_kube_config(config_file=KUBECONFIG_PATH, client_configuration=configuration)
+            except (yaml.YAMLError, ValueError, TypeError, AttributeError) as e:
+                # Not a kubeconfig at all (broken YAML, or a document of the wrong shape):
+                # report it like any other invalid kubeconfig
+                raise ConfigException(f"Invalid kubeconfig: {e}") from e
+            configuration.connection_pool_maxsize = CONNECTION_POOL_MAXSIZE
+            configuration.retries = Retry(
+                total=API_RETRIES,
+                backoff_factor=API_RETRY_BACKOFF,
+                status_forcelist=API_RETRY_STATUSES,
+                allowed_methods=frozenset({"GET"}),
+                # Hand the last error response back so it surfaces as an ApiException with its body
+                raise_on_status=False,
+            )
+            # Scope first: readers only trust _CACHE_SCOPE for the client it was built with
+            _CACHE_SCOPE = _credential_scope(configuration)
+            _API_CLIENT = client.ApiClient(configuration)
+            _KUBECONFIG_MTIME = mtime
+        return _API_CLIENT
+
+
+@functools.lru_cache(maxsize=1)
 def get_api_map_from_csv(filepath: str = "tools/resources.csv"):
     """
-    Reads the resource mapping from a CSV file and returns a dict:
-    {resource: (api_client_instance, method_suffix)}
+    Reads the resource mapping from a CSV file once per process and returns a dict:
+    {resource: (api_version, method_suffix)}
+
+    Only strings are cached, so the map survives ApiClient rebuilds.
     """
     import csv
-    v1 = client.CoreV1Api()
-    apps_v1 = client.AppsV1Api()
     api_map = {}
     with open(filepath, mode='r') as file:
         reader = csv.DictReader(file)
         for row in reader:
-            api_version = row['api_version']
-            if api_version == 'v1':
-                api_client = v1
-            elif api_version == 'apps_v1':
-                api_client = apps_v1
-            else:
-                continue
-            api_map[row['resource']] = (api_client, row['method_suffix'])
+            # Interned so lookups with an interned resource type hit the identity fast path
+            api_map[sys.intern(row['resource'].lower())] = (row['api_version'], row['method_suffix'])
     return api_map
 
 
+@functools.lru_cache(maxsize=1)
+def _build_method_table(shared_client):
+    """
+    Binds every resource to its API methods once per ApiClient and returns
+    {resource: (read_namespaced_<suffix>, list_namespaced_<suffix>)}. Both methods come
+    back from one lookup: even a named read needs the list method for the informer.
+
+    Resources whose API group is not wired up here, or whose API has no namespaced
+    variant (e.g. 'node'), are left out so they are reported as unsupported.
+    """
+    # Keep in sync with _SERVED_API_VERSIONS
+    apis = {
+        'v1': client.CoreV1Api(shared_client),
+        'apps_v1': client.AppsV1Api(shared_client)
+    }
+    method_table = {}
+    resource_map = get_api_map_from_csv(_RESOURCE_MAP_CSV) if _RESOURCE_MAP_CSV else _RESOURCE_MAP
+    for resource, (api_version, method_suffix) in resource_map.items():
+        api_client = apis.get(api_version)
+        if api_client is None:
+            continue
+        list_func = getattr(api_client, f"list_namespaced_{method_suffix}", None)
+        read_func = getattr(api_client, f"read_namespaced_{method_suffix}", None)
+        if list_func and read_func:
+            method_table[resource] = (read_func, list_func)
+    return method_table
+
+
+def _get_method_table():
+    """Returns the method table bound to the current shared ApiClient."""
+    return _build_method_table(_ensure_kube_loaded())
+
+
+def _call_raw(func, **kwargs) -> Dict[str, Any]:
+    """
+    Calls an API method without building the client's model objects: the
+    response body is decoded straight into a dict, skipping the per-field
+    OpenAPI deserialization and the to_dict() walk back.
+    """
+    response = func(_preload_content=False, **kwargs)
+    return _json_loads(response.data)
+
+
+# ----------------------------------------------------------------------
+# RESPONSE CACHE (IN-PROCESS + SHARED REDIS)
+# ----------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=1)
+def _get_redis():
+    """Returns the Redis client, or None when the response cache is disabled."""
+    if redis is None or not REDIS_URL:
+        return None
+    return redis.Redis.from_url(
+        REDIS_URL,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+    )
+
+
+def _credential_scope(configuration) -> str:
+    """
+    Identifies the cluster and the credential used against it, so callers with different
+    RBAC never read each other's cached responses. Secrets are hashed, never stored.
+    """
+    digest = hashlib.sha256()
+    for part in (configuration.username, configuration.password, sorted((configuration.api_key or {}).items())):
+        digest.update(repr(part).encode())
+    if configuration.cert_file:
+        with open(configuration.cert_file, 'rb') as cert:
+            digest.update(cert.read())
+    return f"{configuration.host}:{digest.hexdigest()[:16]}"
+
+
+def _cache_scope(api_method) -> str:
+    """The response-cache scope of the ApiClient an API method is bound to."""
+    api_client = api_method.__self__.api_client
+    if api_client is _API_CLIENT:
+        return _CACHE_SCOPE
+    return _credential_scope(api_client.configuration)
+
+
+def _response_cache_key(scope: str, resource_type: str, namespace: str, name: str = None) -> str:
+    return f"k8s:{scope}:{resource_type}:{namespace}:{name or '*'}"
+
+
+# (key, field) -> decoded response; TTLCache is not thread-safe, so every access holds the lock
+_local_cache = TTLCache(maxsize=LOCAL_CACHE_MAXSIZE, ttl=LOCAL_CACHE_TTL) if TTLCache else None
+_local_cache_lock = threading.Lock()
+
+
+def _response_cache_get(key: str, field: str = None):
+    """
+    Reads a cached response, in-process first and then Redis.
+    List pages live as fields of one hash per list key.
+    """
+    if _local_cache is not None:
+        with _local_cache_lock:
+            cached = _local_cache.get((key, field))
+        if cached is not None:
+            return cached
+
+    r = _get_redis()
+    if r is None:
+        return None
+    try:
+        cached = r.hget(key, field) if field else r.get(key)
+    except redis.RedisError:
+        # The cache is an optimization; never fail a query because of it
+        return None
+    if not cached:
+        return None
+    data = _json_loads(cached)
+    if _local_cache is not None:
+        with _local_cache_lock:
+            _local_cache[(key, field)] = data
+    return data
+
+
+def _response_cache_set(key: str, data, field: str = None):
+    if _local_cache is not None:
+        with _local_cache_lock:
+            _local_cache[(key, field)] = data
+
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        if field:
+            # One hash per list key, so invalidation drops every page size at once
+            r.pipeline().hset(key, field, _json_dumps(data)).expire(key, RESPONSE_CACHE_TTL).execute()
+        else:
+            r.setex(key, RESPONSE_CACHE_TTL, _json_dumps(data))
+    except redis.RedisError:
+        pass
+
+
+def _response_cache_invalidate(scope: str, resource_type: str, namespace: str, name: str):
+    """Drops the list entry and the named entry touched by a watch event."""
+    keys = (
+        _response_cache_key(scope, resource_type, namespace),
+        _response_cache_key(scope, resource_type, namespace, name)
+    )
+    if _local_cache is not None:
+        with _local_cache_lock:
+            for entry in [entry for entry in _local_cache if entry[0] in keys]:
+                _local_cache.pop(entry, None)
+
+    r = _get_redis()
+    if r is None:
+        return
+    try:
+        r.delete(*keys)
+    except redis.RedisError:
+        pass
+
+
+# ----------------------------------------------------------------------
+# WATCH-BACKED READ CACHE (INFORMERS)
+# ----------------------------------------------------------------------
+
+def _watch_raw(list_func, **kwargs):
+    """
+    Streams watch events as plain dicts. Unlike watch.Watch().stream, each event
+    line is decoded once and never turned into model objects.
+    """
+    response = list_func(watch=True, _preload_content=False, **kwargs)
+    try:
+        pending = b''
+        for chunk in response.stream(amt=None, decode_content=False):
+            pending += chunk
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield _json_loads(line)
+    finally:
+        response.close()
+        response.release_conn()
+
+
+class _Informer:
+    """
+    Keeps an in-memory copy of one (resource_type, namespace) list in sync with
+    the cluster: a LIST followed by a WATCH, run on a daemon thread.
+    """
+    def __init__(self, list_func, resource_type: str, namespace: str):
+        self.list_func = list_func
+        self.resource_type = resource_type
+        self.namespace = namespace
+        self._scope = _cache_scope(list_func)
+        self.last_read = time.monotonic()
+        self._items = {}
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    def stop(self):
+        self._stopped.set()
+
+    def get(self, name: str = None):
+        """Returns the cached object (or list), or None if it has to be fetched live."""
+        self.last_read = time.monotonic()
+        if not self._synced.is_set():
+            return None
+        with self._lock:
+            if name:
+                return self._items.get(name)
+            return {'items': list(self._items.values())}
+
+    def _relist(self) -> str:
+        # Paged like any other list, so no single response holds the whole namespace;
+        # every page of one paginated list carries the same snapshot resourceVersion
+        items = {}
+        for page in _list_pages(self.list_func, self.namespace, INFORMER_RELIST_PAGE_SIZE):
+            items.update((obj['metadata']['name'], obj) for obj in page.get('items') or [])
+            resource_version = page['metadata']['resourceVersion']
+        with self._lock:
+            self._items = items
+        self._synced.set()
+        return resource_version
+
+    def _run(self):
+        resource_version = None
+        while not self._stopped.is_set():
+            if time.monotonic() - self.last_read > INFORMER_IDLE_TTL:
+                self.stop()
+                break
+            try:
+                if resource_version is None:
+                    resource_version = self._relist()
+
+                stream = _watch_raw(
+                    self.list_func,
+                    namespace=self.namespace,
+                    resource_version=resource_version,
+                    timeout_seconds=INFORMER_IDLE_TTL
+                )
+                for event in stream:
+                    if event['type'] == 'ERROR':
+                        # Usually 410 Gone: our resource_version is too old, relist
+                        resource_version = None
+                        break
+                    obj = event['object']
+                    resource_version = obj['metadata']['resourceVersion']
+                    with self._lock:
+                        if event['type'] == 'DELETED':
+                            self._items.pop(obj['metadata']['name'], None)
+                        else:
+                            self._items[obj['metadata']['name']] = obj
+                    # Push-based invalidation of the shared response cache
+                    _response_cache_invalidate(self._scope, self.resource_type, self.namespace, obj['metadata']['name'])
+                    if self._stopped.is_set():
+                        break
+            except Exception:
+                # Serve live reads until the informer has resynced
+                self._synced.clear()
+                resource_version = None
+                self._stopped.wait(5)
+
+
+_informers = {}
+_informers_lock = threading.Lock()
+_informers_enabled = False
+
+
+def start_informers():
+    """
+    Enables the watch-backed read cache. Informers are started lazily, one per
+    (resource_type, namespace), on the first query for that pair.
+    """
+    global _informers_enabled
+    _informers_enabled = True
+
+
+def stop_informers():
+    """Disables the read cache and stops every running informer."""
+    global _informers_enabled
+    with _informers_lock:
+        _informers_enabled = False
+        for informer in _informers.values():
+            informer.stop()
+        _informers.clear()
+
+
+def _read_from_informer(list_func, resource_type: str, namespace: str, name: str = None):
+    """Returns cached data for the query, or None on a cache miss."""
+    key = (resource_type, namespace)
+    with _informers_lock:
+        informer = _informers.get(key)
+        # Replace informers that idled out or belong to a previous kubeconfig
+        if informer is None or informer.stopped or informer.list_func != list_func:
+            if informer is not None:
+                informer.stop()
+            informer = _informers[key] = _Informer(list_func, resource_type, namespace)
+    return informer.get(name)
+
+
+# ----------------------------------------------------------------------
+# FIELD PROJECTION
+# ----------------------------------------------------------------------
+
+# Projections are declared as field -> path specs and compiled into straight-line functions at
+# import. A path is dotted keys with at most one '[]' to map over a list ('spec.containers[].image');
+# a (helper, path) pair post-processes the value with one of _PROJECTION_HELPERS.
+_METADATA_SPEC = {
+    'name': 'metadata.name',
+    'namespace': 'metadata.namespace',
+    'labels': 'metadata.labels',
+    'created': 'metadata.creationTimestamp',
+}
+
+_PROJECTION_SPECS = {
+    'pod': {
+        'phase': 'status.phase',
+        'node': 'spec.nodeName',
+        'images': 'spec.containers[].image',
+        'ready': ('_all_true', 'status.containerStatuses[].ready'),
+        'restarts': ('_total', 'status.containerStatuses[].restartCount'),
+    },
+    'service': {
+        'type': 'spec.type',
+        'cluster_ip': 'spec.clusterIP',
+        'ports': ('_port_strings', 'spec.ports[]'),
+        'selector': 'spec.selector',
+    },
+    'deployment': {
+        'replicas': 'spec.replicas',
+        'ready_replicas': ('_or_zero', 'status.readyReplicas'),
+        'available_replicas': ('_or_zero', 'status.availableReplicas'),
+        'images': 'spec.template.spec.containers[].image',
+    },
+}
+
+_PROJECTION_HELPERS = {
+    '_all_true': lambda values: bool(values) and all(values),
+    '_total': lambda values: sum(v or 0 for v in values),
+    '_or_zero': lambda value: value or 0,
+    '_port_strings': lambda ports: [f"{p.get('port')}/{p.get('protocol', 'TCP')}" for p in ports],
+}
+
+
+def _path_expr(path: str, var: str = 'o') -> str:
+    """Turns 'a.b[].c' into nested, None-safe dict.get() expressions on `var`."""
+    head, has_list, tail = path.partition('[]')
+    expr = var
+    for key in head.split('.'):
+        expr = f"({expr} or {{}}).get({key!r})"
+    if not has_list:
+        return expr
+    if not tail:
+        return f"({expr} or [])"
+    return f"[{_path_expr(tail.lstrip('.'), 'i')} for i in ({expr} or [])]"
+
+
+def _compile_projector(resource_type: str, spec: Dict[str, Any]):
+    entries = []
+    for field, path in spec.items():
+        if isinstance(path, tuple):
+            helper, path = path
+            entries.append(f"        {field!r}: {helper}({_path_expr(path)}),")
+        else:
+            entries.append(f"        {field!r}: {_path_expr(path)},")
+    func_name = f"_project_{resource_type}"
+    source = f"def {func_name}(o):\n    return {{\n" + "\n".join(entries) + "\n    }\n"
+    namespace = dict(_PROJECTION_HELPERS)
+    exec(compile(source, f"<projector:{resource_type}>", "exec"), namespace)
+    return namespace[func_name]
+
+
+_project_metadata = _compile_projector('metadata', _METADATA_SPEC)
+
+# Resource types without a dedicated projector fall back to _project_metadata
+_PROJECTORS = {
+    resource_type: _compile_projector(resource_type, {**_METADATA_SPEC, **spec})
+    for resource_type, spec in _PROJECTION_SPECS.items()
+}
+
+
+def _project(data: Dict[str, Any], resource_type: str, fields: List[str]) -> Dict[str, Any]:
+    """
+    Reduces a raw object, or every item of a raw list, to the requested fields.
+    Unknown field names are ignored; the list metadata (continue token) is kept.
+    """
+    projector = _PROJECTORS.get(resource_type, _project_metadata)
+
+    def pick(obj):
+        projected = projector(obj)
+        return {f: projected[f] for f in fields if f in projected}
+
+    if 'items' in data:
+        return {**data, 'items': [pick(item) for item in data['items'] or []]}
+    return pick(data)
+
+
+def _api_error_message(e) -> str:
+    """The apiserver's Status message, or the HTTP reason when the body is missing or not JSON."""
+    if not e.body:
+        return e.reason
+    try:
+        return _json_loads(e.body).get('message') or e.reason
+    except ValueError:
+        return e.reason
+
+
+def _list_pages(list_func, namespace: str, limit: int, **selectors):
+    """Yields raw list pages, following the continue token until the list is exhausted."""
+    continue_token = None
+    while True:
+        page = _call_raw(list_func, namespace=namespace, limit=limit, _continue=continue_token, **selectors)
+        yield page
+        continue_token = (page.get('metadata') or {}).get('continue')
+        if not continue_token:
+            return
+
+
+def _select_names(list_data: Dict[str, Any], names: List[str]) -> Dict[str, Any]:
+    """Keep only the list items whose metadata.name is in `names`."""
+    wanted = set(names)
+    items = [item for item in list_data.get('items') or [] if item.get('metadata', {}).get('name') in wanted]
+    return {**list_data, 'items': items}
+
+
+class QueryResult(NamedTuple):
+    """
+    Result of execute_k8s_query. A fixed-shape tuple is cheaper to build than a dict;
+    call _asdict() where a JSON object is needed.
+    """
+    status: str                          # 'success' or 'error'
+    data: Any                            # the raw resource(s), or the error message
+    continue_token: Optional[str] = None # set when a list page was truncated
+
+
+# Expected failures map to fixed results, built once
+_ERR_NO_KUBECONFIG = QueryResult('error', "No kubeconfig has been uploaded yet. Upload one to query the cluster.")
+_ERR_BAD_KUBECONFIG = QueryResult('error', "The uploaded kubeconfig could not be loaded. Check it and upload it again.")
+_ERR_NO_CLIENT = QueryResult('error', "The 'kubernetes' library is not installed, so live queries are unavailable.")
+_ERR_UNREACHABLE = QueryResult('error', "The Kubernetes API server could not be reached (connection failed or timed out).")
+_ERR_BAD_RESPONSE = QueryResult('error', "The Kubernetes API server returned a response that is not valid JSON.")
+
+
+# ----------------------------------------------------------------------
+# PRIVATE HELPER FUNCTION FOR DEMO RESPONSES
+# ----------------------------------------------------------------------
+
+# Static list responses are built once at import and shared by every call. Their data stays
+# plain dicts (not MappingProxyType) so it remains JSON-serializable; callers only read it.
+_DEMO_POD_LIST = QueryResult('success', {
+    'apiVersion': 'v1',
+    'kind': 'PodList',
+    'items': [
+        {'metadata': {'name': 'app-1-xyz', 'labels': {'app': 'demo-app'}}, 'status': {'phase': 'Running'}},
+        {'metadata': {'name': 'app-2-abc', 'labels': {'app': 'demo-app'}}, 'status': {'phase': 'Running'}},
+        {'metadata': {'name': 'db-a-123', 'labels': {'app': 'database'}}, 'status': {'phase': 'Running'}}
+    ]
+})
+
+_DEMO_DEPLOYMENT_LIST = QueryResult('success', {
+    'apiVersion': 'apps/v1',
+    'kind': 'DeploymentList',
+    'items': [
+        {'metadata': {'name': 'frontend'}, 'status': {'replicas': 3, 'readyReplicas': 3, 'unavailableReplicas': 0}},
+        {'metadata': {'name': 'backend'}, 'status': {'replicas': 2, 'readyReplicas': 1, 'unavailableReplicas': 1}}
+    ]
+})
+
+
+def _demo_pod(name: str, namespace: str) -> QueryResult:
+    # --- DEMO FOR A SINGLE POD (read_namespaced_pod) ---
+    return QueryResult('success', {
+        'apiVersion': 'v1',
+        'kind': 'Pod',
+        'metadata': {'name': name, 'namespace': namespace, 'labels': {'app': 'demo-app'}},
+        'spec': {'containers': [{'name': 'main', 'image': 'nginx:1.21.6', 'ports': [{'containerPort': 80}]}]},
+        'status': {'phase': 'Running', 'hostIP': '192.168.1.10', 'containerStatuses': [{'ready': True, 'restartCount': 0}]}
+    })
+
+
+def _demo_service(name: str, namespace: str) -> QueryResult:
+    # --- DEMO FOR A SINGLE SERVICE (read_namespaced_service) ---
+    return QueryResult('success', {
+        'apiVersion': 'v1',
+        'kind': 'Service',
+        'metadata': {'name': name, 'namespace': namespace},
+        'spec': {'type': 'LoadBalancer', 'ports': [{'port': 80, 'targetPort': 8080}]},
+        'status': {'loadBalancer': {'ingress': [{'ip': '34.100.200.50'}]}}
+    })
+
+
+# (resource_type, name given) -> builder(name, namespace)
+_DEMO_RESPONSES = {
+    ('pod', True): _demo_pod,
+    ('pod', False): lambda name, namespace: _DEMO_POD_LIST,
+    ('service', True): _demo_service,
+    ('deployment', True): lambda name, namespace: _DEMO_DEPLOYMENT_LIST,
+    ('deployment', False): lambda name, namespace: _DEMO_DEPLOYMENT_LIST,
+}
+
+_DEMO_NOT_FOUND = QueryResult(
+    'error',
+    "Kubernetes API Error: Status 404. Reason: Resource 'non-existent-resource' of type 'pod' not found in namespace 'default'."
+)
+
+
+def _handle_demo_response(resource_type: str, namespace: str, name: str) -> QueryResult:
+    """Provides mock Kubernetes API responses for demo mode."""
+    if name == "non-existent-resource":
+        # Simulate a 404 Not Found error
+        return _DEMO_NOT_FOUND
+
+    builder = _DEMO_RESPONSES.get((resource_type.lower(), bool(name)))
+    if builder is None:
+        # --- DEFAULT ERROR FOR UNSUPPORTED DEMO RESOURCE ---
+        return QueryResult(
+            'error',
+            f"Demo mode does not have mock data for '{resource_type}' or the combination requested."
+        )
+    return builder(name, namespace)
 
 
 def execute_k8s_query(
     resource_type: str,
     namespace: str = "default",
     name: str = None,
+    names: Optional[List[str]] = None,
+    limit: int = 500,
+    continue_token: Optional[str] = None,
+    field_selector: Optional[str] = None,
+    label_selector: Optional[str] = None,
+    fields: Optional[List[str]] = None,
     cluster_context: str = None, # Note: This parameter is unused in the current logic
     demo_mode: bool = False
-) -> Dict[str, Union[str, Dict[str, Any]]]:
+) -> QueryResult:
     """
     REQUIRED TOOL: Use this function to query the state of Kubernetes resources.
     
@@ -58,140 +780,244 @@ def execute_k8s_query(
         resource_type (str): The specific kind of resource. Use lowercase (e.g., 'pod', 'service', 'deployment').
         namespace (str, optional): The namespace to search in. Defaults to 'default'.
         name (str, optional): The name of a single resource (e.g., 'my-app-pod-1'). If omitted, lists ALL resources of the type in the namespace.
+        names (list[str], optional): Several resource names to fetch at once. Served from ONE list call filtered by name
+            (field selectors have no 'in' operator), instead of one read per name. Cannot be combined with 'name'.
+        limit (int, optional): Maximum number of items per list page. Defaults to 500. Ignored for 'name' and 'names' lookups.
+        continue_token (str, optional): The 'continue' value returned with the previous page, to fetch the next one.
+        field_selector (str, optional): Server-side filter on object fields for list calls, e.g. 'status.phase=Running'
+            or 'spec.nodeName=node-1'.
+        label_selector (str, optional): Server-side filter on labels for list calls, e.g. 'app=demo-app'
+            or 'tier in (frontend,backend)'.
+        fields (list[str], optional): Return only these summary fields instead of the full objects, e.g.
+            ['name', 'phase', 'images'] for pods. Every type has 'name', 'namespace', 'labels' and 'created';
+            pods, services and deployments add their own (see _PROJECTION_SPECS).
         cluster_context (str, optional): The name of the cluster context defined in the kubeconfig file. Omit for the current default cluster.
         demo_mode (bool): If True, skips API call and returns mock data for testing.
         
     Returns:
-        dict: A dictionary with 'status' ('success' or 'error') and the 'data', which contains the raw resource(s) in JSON format.
+        QueryResult: 'status' ('success' or 'error') and the 'data', which contains the raw resource(s) in JSON format.
+              A truncated list also carries a 'continue_token' to pass back for the next page.
     """
     
 
     if demo_mode:
-        # Implement demo logic here if needed, for now it will just pass through
-        pass
+        # Canned responses only: never touch the kubeconfig or the API
+        return _handle_demo_response(resource_type, namespace, name)
 
-    method_name = "" # Initialize for use in the final except block
     try:
 
-        # 1. Load configuration (ideally, do this once outside the function)
-        config.load_kube_config(config_file="tmp/uploads/config")
+        # 1. Reuse the shared ApiClient (kubeconfig is only reloaded when it changes)
+        method_table = _get_method_table()
+        # Interned like the table keys (literals are interned by the compiler), so the
+        # dict lookup matches on identity instead of comparing characters
+        resource_type_lower = sys.intern(resource_type.lower())
 
-        resource_map = get_api_map_from_csv()
-        resource_type_lower = resource_type.lower()
+        methods = method_table.get(resource_type_lower)
+        if methods is None:
+            return QueryResult('error', f"Unsupported resource type: '{resource_type}'.")
+        read_func, list_func = methods
 
-        if resource_type_lower not in resource_map:
-            return {'status': 'error', 'data': f"Unsupported resource type: '{resource_type}'."}
+        if name and names:
+            return QueryResult('error', "Pass either 'name' or 'names', not both.")
 
-        api_client, method_suffix = resource_map[resource_type_lower]
+        # A 'names' batch is answered from the namespace list, never from N separate reads
+        data = None
+        paged = not name and not names
+        # Selectors only apply to list calls; the apiserver does the filtering
+        selectors = {}
+        if not name:
+            if field_selector:
+                selectors['field_selector'] = field_selector
+            if label_selector:
+                selectors['label_selector'] = label_selector
 
-        # 2. Determine method name and arguments concisely 👈 REFINED LOGIC
-        action = "read" if name else "list"
-        method_name = f"{action}_namespaced_{method_suffix}"
-        
-        # Prepare arguments dynamically
-        kwargs = {'namespace': namespace}
-        if name:
-            kwargs['name'] = name
+        # Serve from the informer cache when possible; fall through to a live call on a miss.
+        # The informer holds the whole, unfiltered list and has no continue tokens, so it only
+        # answers a first page that fits within `limit`; longer lists are paged live.
+        if _informers_enabled and not continue_token and not selectors:
+            data = _read_from_informer(list_func, resource_type_lower, namespace, name)
+            if data is not None and paged and len(data['items']) > limit:
+                data = None
+
+        if data is None:
+            # Then the response cache, in-process and shared (first pages only; continuations are one-shot)
+            cache_key = _response_cache_key(_cache_scope(list_func), resource_type_lower, namespace, name)
+            cache_field = f"{limit}|{field_selector or ''}|{label_selector or ''}" if paged else None
+            cacheable = not continue_token and not names and resource_type_lower not in _UNCACHED_RESOURCES
+            if cacheable:
+                data = _response_cache_get(cache_key, cache_field)
+
+        if data is None:
+            # 2. Call the pre-bound read/list method and decode the JSON body directly
+            if name:
+                data = _call_raw(read_func, name=name, namespace=namespace)
+            elif names:
+                # Filter page by page so only the matches are kept in memory
+                data = {'items': [item for page in _list_pages(list_func, namespace, limit, **selectors) for item in _select_names(page, names)['items']]}
+            else:
+                data = _call_raw(list_func, namespace=namespace, limit=limit, _continue=continue_token, **selectors)
+            if cacheable:
+                _response_cache_set(cache_key, data, cache_field)
+
+        if names:
+            data = _select_names(data, names)
 
-        # 3. Get and execute the function
-        func = getattr(api_client, method_name)
-        result_obj = func(**kwargs)
+        # Project last: the caches always hold the full objects
+        if fields:
+            data = _project(data, resource_type_lower, fields)
 
-        # 4. Serialize to dict and return
-        return {'status': 'success', 'data': result_obj.to_dict()}
+        next_token = (data.get('metadata') or {}).get('continue') if paged else None
+        return QueryResult('success', data, next_token or None)
 
     except ApiException as e:
         # 👈 CORRECTION 1: Handle Kubernetes API errors
-        error_body = json.loads(e.body)
-        return {'status': 'error', 'data': f"Kubernetes API Error: {error_body.get('message')}"}
+        return QueryResult('error', f"Kubernetes API Error: {_api_error_message(e)}")
 
-    except AttributeError:
-        # 👈 CORRECTION 2: Handle incorrect method names
-        return {'status': 'error', 'data': f"Internal Tool Error: Could not find method '{method_name}'. Check the API map."}
-        
-    except Exception as e:
-        # 👈 CORRECTION 3: Handle all other unexpected errors
-        return {'status': 'error', 'data': f"An unexpected error occurred: {str(e)}"}
+    except FileNotFoundError:
+        return _ERR_NO_KUBECONFIG
 
+    except ConfigException:
+        return _ERR_BAD_KUBECONFIG
 
+    except ImportError:
+        return _ERR_NO_CLIENT
 
+    except json.JSONDecodeError:
+        # orjson's JSONDecodeError subclasses the stdlib one
+        return _ERR_BAD_RESPONSE
 
-# ----------------------------------------------------------------------
-# PRIVATE HELPER FUNCTION FOR DEMO RESPONSES
-# ----------------------------------------------------------------------
+    except _TRANSIENT_ERRORS:
+        # 👈 CORRECTION 2: Only expected transport failures are reported here; anything
+        # else is a bug and propagates to the caller to be logged once
+        return _ERR_UNREACHABLE
 
-def _handle_demo_response(resource_type: str, namespace: str, name: str) -> Dict[str, Union[str, Dict[str, Any]]]:
-    """Provides mock Kubernetes API responses for demo mode."""
-    resource_type_lower = resource_type.lower()
-    
-    if name and name == "non-existent-resource":
-        # Simulate a 404 Not Found error
-        return {
-            'status': 'error', 
-            'data': "Kubernetes API Error: Status 404. Reason: Resource 'non-existent-resource' of type 'pod' not found in namespace 'default'."
-        }
 
-    # --- DEMO FOR A SINGLE POD (read_namespaced_pod) ---
-    if resource_type_lower == 'pod' and name:
-        return {
-            'status': 'success',
-            'data': {
-                'apiVersion': 'v1',
-                'kind': 'Pod',
-                'metadata': {'name': name, 'namespace': namespace, 'labels': {'app': 'demo-app'}},
-                'spec': {'containers': [{'name': 'main', 'image': 'nginx:1.21.6', 'ports': [{'containerPort': 80}]}]},
-                'status': {'phase': 'Running', 'hostIP': '192.168.1.10', 'containerStatuses': [{'ready': True, 'restartCount': 0}]}
-            }
-        }
-    
-    # --- DEMO FOR LIST OF PODS (list_namespaced_pod) ---
-    elif resource_type_lower == 'pod':
-        return {
-            'status': 'success',
-            'data': {
-                'apiVersion': 'v1',
-                'kind': 'PodList',
-                'items': [
-                    {'metadata': {'name': 'app-1-xyz', 'labels': {'app': 'demo-app'}}, 'status': {'phase': 'Running'}},
-                    {'metadata': {'name': 'app-2-abc', 'labels': {'app': 'demo-app'}}, 'status': {'phase': 'Running'}},
-                    {'metadata': {'name': 'db-a-123', 'labels': {'app': 'database'}}, 'status': {'phase': 'Running'}}
-                ]
-            }
-        }
 
-    # --- DEMO FOR A SINGLE SERVICE (read_namespaced_service) ---
-    elif resource_type_lower == 'service' and name:
-        return {
-            'status': 'success',
-            'data': {
-                'apiVersion': 'v1',
-                'kind': 'Service',
-                'metadata': {'name': name, 'namespace': namespace},
-                'spec': {'type': 'LoadBalancer', 'ports': [{'port': 80, 'targetPort': 8080}]},
-                'status': {'loadBalancer': {'ingress': [{'ip': '34.100.200.50'}]}}
-            }
-        }
-
-    # --- DEMO FOR LIST OF DEPLOYMENTS (list_namespaced_deployment) ---
-    elif resource_type_lower == 'deployment':
-        return {
-            'status': 'success',
-            'data': {
-                'apiVersion': 'apps/v1',
-                'kind': 'DeploymentList',
-                'items': [
-                    {'metadata': {'name': 'frontend'}, 'status': {'replicas': 3, 'readyReplicas': 3, 'unavailableReplicas': 0}},
-                    {'metadata': {'name': 'backend'}, 'status': {'replicas': 2, 'readyReplicas': 1, 'unavailableReplicas': 1}}
-                ]
-            }
-        }
-        
-    # --- DEFAULT ERROR FOR UNSUPPORTED DEMO RESOURCE ---
-    else:
-        return {
-            'status': 'error', 
-            'data': f"Demo mode does not have mock data for '{resource_type}' or the combination requested."
-        }
+
+def list_all(
+    resource_type: str,
+    namespace: str = "default",
+    limit: int = 500,
+    field_selector: Optional[str] = None,
+    label_selector: Optional[str] = None
+):
+    """
+    Iterates over a whole list one page at a time, so at most `limit` items are in memory.
+
+    Yields:
+        QueryResult: One execute_k8s_query result per page. Stops after the last page or the first error.
+    """
+    continue_token = None
+    while True:
+        result = execute_k8s_query(
+            resource_type, namespace, limit=limit, continue_token=continue_token,
+            field_selector=field_selector, label_selector=label_selector
+        )
+        yield result
+        continue_token = result.continue_token
+        if result.status != 'success' or not continue_token:
+            return
+
+
+def _stream_items(list_func, namespace: str, limit: int, continue_token: Optional[str], selectors: Dict[str, str], out: list):
+    """
+    Yields the items of one raw list page as they are parsed off the socket.
+    The page's continue token is appended to `out` once the body has been read.
+    """
+    response = list_func(namespace=namespace, limit=limit, _continue=continue_token, _preload_content=False, **selectors)
+    try:
+        builder = None
+        for prefix, event, value in ijson.parse(response, use_float=True):
+            if prefix == 'metadata.continue' and event == 'string':
+                out.append(value)
+            elif prefix == 'items.item' and event == 'start_map':
+                builder = ijson.ObjectBuilder()
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == 'items.item' and event == 'end_map':
+                    yield builder.value
+                    builder = None
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def execute_k8s_query_stream(
+    resource_type: str,
+    namespace: str = "default",
+    fields: Optional[List[str]] = None,
+    limit: int = 500,
+    field_selector: Optional[str] = None,
+    label_selector: Optional[str] = None
+):
+    """
+    Yields every item of a list one at a time, across all pages, so a caller can stop
+    as soon as it has found what it needs.
+
+    With ijson installed each page is parsed incrementally and only one item is held in
+    memory; without it, one decoded page at a time. Caches and informers are bypassed.
+
+    Args:
+        resource_type, namespace, limit, field_selector, label_selector: As for execute_k8s_query.
+        fields (list[str], optional): Project each item down to these fields (see _PROJECTION_SPECS).
+
+    Yields:
+        dict: One raw (or projected) resource per item.
+
+    Raises:
+        ValueError: If the resource type is not supported.
+        ApiException: On Kubernetes API errors; nothing is caught here.
+    """
+    resource_type_lower = sys.intern(resource_type.lower())
+    methods = _get_method_table().get(resource_type_lower)
+    if methods is None:
+        raise ValueError(f"Unsupported resource type: '{resource_type}'.")
+    list_func = methods[1]
+    selectors = {}
+    if field_selector:
+        selectors['field_selector'] = field_selector
+    if label_selector:
+        selectors['label_selector'] = label_selector
+
+    continue_token = None
+    while True:
+        if ijson is not None:
+            token = []
+            items = _stream_items(list_func, namespace, limit, continue_token, selectors, token)
+        else:
+            page = _call_raw(list_func, namespace=namespace, limit=limit, _continue=continue_token, **selectors)
+            token = [(page.get('metadata') or {}).get('continue')]
+            items = page.get('items') or []
+
+        for item in items:
+            yield _project(item, resource_type_lower, fields) if fields else item
+
+        continue_token = token[0] if token else None
+        if not continue_token:
+            return
+
+
+def execute_k8s_queries(queries: List[Dict[str, Any]]) -> List[QueryResult]:
+    """
+    Runs several independent queries concurrently and returns their results in order.
+
+    Wall time is roughly the slowest query instead of the sum of all of them; every
+    worker shares the ApiClient's connection pool.
+
+    Args:
+        queries (list[dict]): Keyword arguments for execute_k8s_query, e.g.
+            [{'resource_type': 'pod', 'namespace': 'web'}, {'resource_type': 'service', 'namespace': 'web'}]
+    """
+    if not queries:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(queries), CONNECTION_POOL_MAXSIZE)) as pool:
+        return list(pool.map(lambda query: execute_k8s_query(**query), queries))
+
+
+async def aexecute_k8s_queries(queries: List[Dict[str, Any]]) -> List[QueryResult]:
+    """Async variant of execute_k8s_queries for callers already running an event loop."""
+    return list(await asyncio.gather(*(asyncio.to_thread(execute_k8s_query, **query) for query in queries)))
+
 
 # --- Example Usage for Testing Demo Mode ---
 if __name__ == "__main__":
@@ -203,27 +1029,27 @@ if __name__ == "__main__":
     # 1. Test: Single Pod Lookup (Success Case)
     print("\n--- TEST 1: Get Single Pod Details ---")
     pod_result = execute_k8s_query(resource_type='Pod', name='auth-service-pod-1', demo_mode=True)
-    print(f"Status: {pod_result['status']}")
-    print(f"Pod Phase: {pod_result['data'].get('status', {}).get('phase', 'N/A')}")
-    print(f"Image Used: {pod_result['data'].get('spec', {}).get('containers', [{}])[0].get('image', 'N/A')}")
+    print(f"Status: {pod_result.status}")
+    print(f"Pod Phase: {pod_result.data.get('status', {}).get('phase', 'N/A')}")
+    print(f"Image Used: {pod_result.data.get('spec', {}).get('containers', [{}])[0].get('image', 'N/A')}")
     
     # 2. Test: List Pods (List Case)
     print("\n--- TEST 2: List All Pods in Namespace ---")
     list_result = execute_k8s_query(resource_type='pod', demo_mode=True)
-    print(f"Status: {list_result['status']}")
-    print(f"Total Pods in Demo: {len(list_result['data'].get('items', []))}")
+    print(f"Status: {list_result.status}")
+    print(f"Total Pods in Demo: {len(list_result.data.get('items', []))}")
 
     # 3. Test: Resource Not Found (Error Case)
     print("\n--- TEST 3: Non-Existent Resource (Simulated 404 Error) ---")
     error_result = execute_k8s_query(resource_type='Pod', name='non-existent-resource', demo_mode=True)
-    print(f"Status: {error_result['status']}")
-    print(f"Error Message: {error_result['data']}")
+    print(f"Status: {error_result.status}")
+    print(f"Error Message: {error_result.data}")
     
     # 4. Test: List Deployments (Example of AppsV1 API)
     print("\n--- TEST 4: Get Deployment Status ---")
     deployment_result = execute_k8s_query(resource_type='deployment', demo_mode=True)
-    print(f"Status: {deployment_result['status']}")
-    first_deploy_status = deployment_result['data']['items'][0]['status']
+    print(f"Status: {deployment_result.status}")
+    first_deploy_status = deployment_result.data['items'][0]['status']
     print(f"Frontend Deployment Replicas: {first_deploy_status['readyReplicas']} / {first_deploy_status['replicas']}")
     
     